@@ -1,6 +1,10 @@
 import json
+import boto3
+import logging
 import pymysql
 import os
+import time
+import uuid
 import urllib.request
 import urllib.error
 import concurrent.futures
@@ -13,9 +17,33 @@ DB_PASSWORD = os.environ['DB_PASSWORD']
 DB_NAME = os.environ['DB_NAME']
 TOGETHER_API_KEY = os.environ['TOGETHER_API_KEY']
 
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
 # Together.ai endpoint for chat-based completions
 TOGETHER_API_URL = "https://api.together.xyz/v1/chat/completions"
 
+# Section scheduling
+MAX_WORKERS = 6
+# Time kept in reserve to hand unfinished sections to a follow-up invocation before the Lambda times out.
+# Capped at MAX_MARGIN_FRACTION of the time an invocation starts with (7.5 s of a 30 s timeout) so short
+# timeouts still leave time to format sections.
+DEADLINE_MARGIN_MS = int(os.environ.get('DEADLINE_MARGIN_MS', 10000))
+MAX_MARGIN_FRACTION = 0.25
+# Follow-up invocations allowed before leftover sections are stored as errors
+MAX_HANDOFFS = 3
+# Latency estimate for a section: fixed per-call overhead + time per input character
+BASE_SECTION_MS = 1500
+DEFAULT_MS_PER_CHAR = 5.0
+# Inputs shorter than this (e.g. "N/A") are almost all overhead and are not used to learn the per-character rate
+MIN_HISTORY_CHARS = 50
+
+# Columns added to linkedin_profile_sections after its first release, used to skip sections a retried run already stored
+TRACKING_COLUMNS = [("run_id", "VARCHAR(64)"), ("resume_section_id", "INT")]
+
+# Recorded LLM latency beyond the fixed overhead (ms per input character) per section, kept across warm invocations
+section_latency_history = {}
+
 # Optional: Create the LinkedIn profile sections table
 def create_linkedin_profile_sections_table():
     conn = pymysql.connect(
@@ -31,10 +59,28 @@ def create_linkedin_profile_sections_table():
             id INT AUTO_INCREMENT PRIMARY KEY,
             section VARCHAR(255) NOT NULL,
             content TEXT NOT NULL,
+            run_id VARCHAR(64),
+            resume_section_id INT,
             generated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         );
         """
         cursor.execute(create_table_query)
+
+        # Add the tracking columns to tables created before they existed; safe to run on every invocation
+        cursor.execute(
+            "SELECT COLUMN_NAME FROM information_schema.COLUMNS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'linkedin_profile_sections'"
+        )
+        existing = {name.lower() for (name,) in cursor.fetchall()}
+        for column, definition in TRACKING_COLUMNS:
+            if column in existing:
+                continue
+            try:
+                cursor.execute(f"ALTER TABLE linkedin_profile_sections ADD COLUMN {column} {definition}")
+            except pymysql.err.MySQLError as e:
+                # 1060: duplicate column name, another invocation added it first
+                if e.args[0] != 1060:
+                    raise
     conn.commit()
     conn.close()
 
@@ -381,6 +427,109 @@ def format_section(section, content):
     except Exception as e:
         return f"Error: {str(e)}"
 
+# Estimate how long a section will take to format from its length and past latencies
+def estimate_section_ms(section, content):
+    ms_per_char = section_latency_history.get(section.lower(), DEFAULT_MS_PER_CHAR)
+    return BASE_SECTION_MS + ms_per_char * len(content or "")
+
+# Update the per-character rate with an exponential moving average, keeping the fixed overhead out of it
+def record_section_latency(section, content, elapsed_ms):
+    length = len(content or "")
+    if length < MIN_HISTORY_CHARS:
+        return
+    ms_per_char = max(elapsed_ms - BASE_SECTION_MS, 0) / length
+    previous = section_latency_history.get(section.lower())
+    section_latency_history[section.lower()] = ms_per_char if previous is None else 0.7 * previous + 0.3 * ms_per_char
+
+def timed_format_section(section, content):
+    start = time.monotonic()
+    formatted = format_section(section, content)
+    return formatted, (time.monotonic() - start) * 1000
+
+# Time left in the invocation, unbounded when run without a Lambda context
+def remaining_ms(context):
+    if context is None:
+        return float('inf')
+    return context.get_remaining_time_in_millis()
+
+# Time to keep in reserve for the hand-off, capped so short timeouts still leave room to work
+def deadline_margin_ms(context):
+    if context is None:
+        return 0
+    remaining = context.get_remaining_time_in_millis()
+    cap = remaining * MAX_MARGIN_FRACTION
+    if DEADLINE_MARGIN_MS >= remaining:
+        logger.error(
+            "Configuration error: DEADLINE_MARGIN_MS (%d ms) is not below the Lambda timeout (%d ms left); "
+            "using %d ms instead", DEADLINE_MARGIN_MS, remaining, cap
+        )
+    elif DEADLINE_MARGIN_MS > cap:
+        logger.info("DEADLINE_MARGIN_MS (%d ms) capped at %d ms of %d ms left", DEADLINE_MARGIN_MS, cap, remaining)
+    return min(DEADLINE_MARGIN_MS, cap)
+
+def schedule_sections(rows, context, on_result):
+    """
+    Format (resume_section_id, section, content) rows in parallel while respecting the Lambda deadline:
+    - Starts the longest expected sections first to reduce total run time
+    - Only starts sections expected to finish before the deadline margin; if none fit and nothing
+      has been started yet, fills the pool with the longest ones anyway so the invocation makes progress
+    - Passes each row and its result to on_result as soon as it completes
+    - Returns the rows that were not finished before the deadline
+    """
+    margin_ms = deadline_margin_ms(context)
+    queue = sorted(rows, key=lambda row: estimate_section_ms(row[1], row[2]), reverse=True)
+    running = {}
+    started = 0
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=MAX_WORKERS)
+
+    try:
+        while queue or running:
+            budget = remaining_ms(context) - margin_ms
+            if budget <= 0:
+                break
+
+            fitting = [row for row in queue if estimate_section_ms(row[1], row[2]) <= budget]
+            if not fitting and not started:
+                fitting = queue
+            for row in fitting[:MAX_WORKERS - len(running)]:
+                queue.remove(row)
+                running[executor.submit(timed_format_section, row[1], row[2])] = row
+                started += 1
+
+            # Whatever is left in the queue can't finish in time and is handed off
+            if not running:
+                break
+
+            timeout = None if budget == float('inf') else budget / 1000
+            done, _ = concurrent.futures.wait(running, timeout=timeout, return_when=concurrent.futures.FIRST_COMPLETED)
+
+            for future in done:
+                row = running.pop(future)
+                try:
+                    formatted, elapsed_ms = future.result()
+                    if not formatted.startswith("Error:"):
+                        record_section_latency(row[1], row[2], elapsed_ms)
+                except Exception as e:
+                    formatted = f"Error: {str(e)}"
+                on_result(row, formatted)
+    finally:
+        # Calls still running at the deadline overran their estimate. Waiting for them would time out the
+        # invocation, so they are abandoned: their results are discarded and the follow-up invocation
+        # requests those sections again. The threads may still finish inside a later invocation that
+        # reuses this container, but their results are never stored.
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return list(running.values()) + queue
+
+# Pass unfinished sections to an asynchronous invocation of this same function. Only their ids are sent,
+# keeping the payload well under the 256 KB limit for asynchronous invocations.
+def hand_off_sections(section_ids, run_id, handoffs, context):
+    boto3.client('lambda').invoke(
+        FunctionName=context.invoked_function_arn,
+        InvocationType='Event',
+        Payload=json.dumps({'section_ids': section_ids, 'run_id': run_id, 'handoffs': handoffs}).encode('utf-8')
+    )
+
 # Main Lambda function entry point
 def lambda_handler(event, context):
     # Create table (only once)
@@ -394,37 +543,72 @@ def lambda_handler(event, context):
         database=DB_NAME
     )
 
-    with conn.cursor() as cursor:
-        cursor.execute("SELECT section, content FROM resume_sections")
-        rows = cursor.fetchall()
-
-    # Run API calls in parallel
-    with concurrent.futures.ThreadPoolExecutor(max_workers=6) as executor:
-        future_to_section = {
-            executor.submit(format_section, section, content): (section, content)
-            for section, content in rows
-        }
-
-        results = []
-        for future in concurrent.futures.as_completed(future_to_section):
-            section, content = future_to_section[future]
-            try:
-                formatted = future.result()
-                results.append((section, formatted))
-            except Exception as e:
-                results.append((section, f"Error: {str(e)}"))
+    try:
+        # Follow-up invocations carry the run id and the ids of the sections left over by the previous one.
+        # Lambda retries an event with the same request id, so a retried run skips what it already stored.
+        if isinstance(event, dict) and event.get('section_ids'):
+            run_id = event['run_id']
+            section_ids = tuple(event['section_ids'])
+            placeholders = ", ".join(["%s"] * len(section_ids))
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    f"SELECT id, section, content FROM resume_sections WHERE id IN ({placeholders})", section_ids
+                )
+                rows = cursor.fetchall()
+            handoffs = event.get('handoffs', 0)
+        else:
+            run_id = getattr(context, 'aws_request_id', None) or str(uuid.uuid4())
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT id, section, content FROM resume_sections")
+                rows = cursor.fetchall()
+            handoffs = 0
 
-    # Insert into DB
-    with conn.cursor() as cursor:
-        for section, formatted in results:
-            cursor.execute(
-                "INSERT INTO linkedin_profile_sections (section, content) VALUES (%s, %s)",
-                (section, formatted)
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT resume_section_id FROM linkedin_profile_sections WHERE run_id = %s", (run_id,))
+            stored = {stored_id for (stored_id,) in cursor.fetchall()}
+        rows = [row for row in rows if row[0] not in stored]
+
+        # Insert each section as soon as it is formatted so finished work survives a timeout
+        def store_section(row, formatted):
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    "INSERT INTO linkedin_profile_sections (section, content, run_id, resume_section_id) "
+                    "VALUES (%s, %s, %s, %s)",
+                    (row[1], formatted, run_id, row[0])
+                )
+            conn.commit()
+
+        unfinished = schedule_sections(rows, context, store_section)
+        finished = len(rows) - len(unfinished)
+
+        if not unfinished:
+            message = 'All sections processed consistently and stored successfully.'
+        elif finished == 0 and handoffs == 0:
+            # Handing off would only pass the same sections on again; failing lets Lambda retry the original event
+            raise RuntimeError(
+                f"No sections were formatted before the deadline ({len(unfinished)} left); "
+                "check the Lambda timeout and DEADLINE_MARGIN_MS"
             )
-    conn.commit()
-    conn.close()
+        elif finished > 0 and handoffs < MAX_HANDOFFS:
+            try:
+                hand_off_sections([row[0] for row in unfinished], run_id, handoffs + 1, context)
+                message = f'{finished} sections stored, {len(unfinished)} handed off to a follow-up invocation.'
+            except Exception as e:
+                logger.error("Could not hand off %d sections: %s", len(unfinished), e)
+                for row in unfinished:
+                    store_section(row, f"Error: could not hand off section to a follow-up invocation: {str(e)}")
+                message = f'{finished} sections stored, {len(unfinished)} could not be handed off.'
+        else:
+            # Out of hand-offs, or a follow-up that made no progress: a retry of its event would only fail
+            # the same way and then be dropped, so record the sections as errors the user can see
+            logger.error("Giving up on %d sections after %d hand-offs", len(unfinished), handoffs)
+            for row in unfinished:
+                store_section(row, "Error: timed out before the section could be formatted")
+            message = f'{finished} sections stored, {len(unfinished)} timed out.'
+    finally:
+        conn.close()
 
     return {
         'statusCode': 200,
-        'body': json.dumps('All sections processed consistently and stored successfully.')
+        'body': json.dumps(message)
     }
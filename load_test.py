@@ -0,0 +1,336 @@
+import argparse
+import concurrent.futures
+import io
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import boto3
+import pymysql
+
+from local_services import LambdaContext, LocalDatabase, StubLambda, load_module
+
+# End-to-end load test for the upload -> extractor -> formatter -> app read path.
+# The real handlers are used as-is; only S3, Textract, Together and MySQL are
+# replaced with local stand-ins so the pipeline can be driven concurrently.
+#
+#   python load_test.py --uploads 50 --concurrency 10 --llm-latency 800 --rate-429 0.05
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+SAMPLE_RESUME = """Jane Doe
+Professional Experience
+Data Analyst Tech Solutions Inc
+2018 - 2020
+built dashboards that increased sales team efficiency by 30%
+led data migration project reducing storage costs
+Junior Analyst Research Corp
+2016 - 2018
+developed automated weekly reports
+Education
+Bachelor of Science in Computer Science, State University
+dean's list all semesters
+Technical Skills
+python, sql, tableau
+Certifications
+aws certified cloud practitioner
+Projects
+resume parser using aws textract
+Computer Knowledge
+linux, git, docker
+"""
+
+STAGES = ["upload", "extract", "format", "read", "total"]
+
+
+# Sleep for roughly `latency_ms`, spread by +/- `jitter` (a fraction of the latency)
+def simulate_latency(latency_ms, jitter):
+    if latency_ms <= 0:
+        return
+    spread = latency_ms * jitter
+    time.sleep(max(0.0, random.uniform(latency_ms - spread, latency_ms + spread)) / 1000)
+
+
+# In-memory S3 bucket with configurable per-call latency
+class StubS3:
+    def __init__(self, latency_ms, jitter):
+        self.latency_ms = latency_ms
+        self.jitter = jitter
+        self.objects = {}
+        self.lock = threading.Lock()
+
+    def upload_fileobj(self, fileobj, bucket, key):
+        simulate_latency(self.latency_ms, self.jitter)
+        with self.lock:
+            self.objects[(bucket, key)] = fileobj.read()
+
+    def download_file(self, bucket, key, filename):
+        simulate_latency(self.latency_ms, self.jitter)
+        with self.lock:
+            body = self.objects[(bucket, key)]
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        with open(filename, 'wb') as f:
+            f.write(body)
+
+
+# Textract stand-in: treats the document bytes as plain text and returns one LINE block per line
+class StubTextract:
+    def __init__(self, latency_ms, jitter):
+        self.latency_ms = latency_ms
+        self.jitter = jitter
+
+    def detect_document_text(self, Document):
+        simulate_latency(self.latency_ms, self.jitter)
+        lines = Document['Bytes'].decode('utf-8').splitlines()
+        return {'Blocks': [{'BlockType': 'LINE', 'Text': line} for line in lines if line.strip()]}
+
+
+# Together.ai stand-in: a local HTTP server with configurable latency and 429 rate
+class StubTogetherHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        server = self.server
+        payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        simulate_latency(server.latency_ms, server.jitter)
+
+        throttled = random.random() < server.rate_429
+        with server.lock:
+            server.requests += 1
+            if throttled:
+                server.throttled += 1
+
+        if throttled:
+            self.respond(429, {"error": {"message": "rate limit exceeded", "type": "rate_limit"}})
+            return
+
+        # Echo the resume section back as bullet points
+        user_prompt = payload['messages'][-1]['content']
+        lines = [line for line in user_prompt.splitlines()[3:] if line.strip()]
+        content = "\n".join(f"- {line}" for line in lines) or "N/A"
+        self.respond(200, {"choices": [{"message": {"role": "assistant", "content": content}}]})
+
+    def respond(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+# Accept a full burst of concurrent section calls without dropping connections
+class StubTogetherServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+def start_together_stub(latency_ms, jitter, rate_429):
+    server = StubTogetherServer(("127.0.0.1", 0), StubTogetherHandler)
+    server.latency_ms = latency_ms
+    server.jitter = jitter
+    server.rate_429 = rate_429
+    server.lock = threading.Lock()
+    server.requests = 0
+    server.throttled = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# Point boto3 and pymysql at the stand-ins, then import the real handlers
+def load_pipeline(s3, textract, lambda_client, database, together_url, deadline_margin_ms):
+    os.environ.update({
+        "DB_HOST": "localhost",
+        "DB_USER": "loadtest",
+        "DB_PASSWORD": "loadtest",
+        "DB_NAME": "loadtest",
+        "DB_PORT": "3306",
+        "S3_BUCKET": "loadtest-bucket",
+        "TOGETHER_API_KEY": "loadtest",
+    })
+    clients = {'s3': s3, 'textract': textract, 'lambda': lambda_client}
+    boto3.client = lambda service, *args, **kwargs: clients[service]
+    pymysql.connect = database.connect
+
+    extractor = load_module("extractor", os.path.join(ROOT, "lambda", "extractor.py"))
+    formatter = load_module("formatter", os.path.join(ROOT, "lambda", "formatter.py"))
+    formatter.TOGETHER_API_URL = together_url
+    if deadline_margin_ms is not None:
+        formatter.DEADLINE_MARGIN_MS = deadline_margin_ms
+
+    # app.py renders its Streamlit page on import; outside `streamlit run` that is a no-op.
+    # Parse Streamlit's config first so it doesn't reset the log level to print bare-mode warnings.
+    import streamlit.config
+    import streamlit.logger
+    streamlit.config.get_config_options()
+    streamlit.logger.set_log_level("error")
+    app = load_module("app", os.path.join(ROOT, "app.py"))
+    return app, extractor, formatter
+
+
+# Run one resume through the whole pipeline and time each stage
+def simulate_upload(app, extractor, formatter, lambda_client, database, lambda_timeout_ms, run_id, index):
+    name = f"loadtest-{run_id}-{index}"
+    database.use(name)
+    timings = {}
+
+    start = time.perf_counter()
+    document = io.BytesIO(SAMPLE_RESUME.encode("utf-8"))
+    document.name = name
+    key = app.upload_to_s3(document) + ".pdf"
+    timings["upload"] = time.perf_counter() - start
+
+    stage_start = time.perf_counter()
+    event = {'Records': [{'s3': {'bucket': {'name': app.S3_BUCKET}, 'object': {'key': key}}}]}
+    extractor.lambda_handler(event, None)
+    timings["extract"] = time.perf_counter() - stage_start
+
+    # Includes any follow-up invocations the formatter hands unfinished sections to
+    stage_start = time.perf_counter()
+    payloads = [{}]
+    while payloads:
+        formatter.lambda_handler(payloads.pop(0), LambdaContext(lambda_timeout_ms))
+        payloads.extend(lambda_client.take())
+    timings["format"] = time.perf_counter() - stage_start
+
+    stage_start = time.perf_counter()
+    profile = app.get_profile_data()
+    timings["read"] = time.perf_counter() - stage_start
+
+    timings["total"] = time.perf_counter() - start
+    failed_sections = sum(1 for content in profile.values() if content.startswith("Error:"))
+    os.remove(f"/tmp/{key}")
+    return timings, len(profile), failed_sections
+
+
+# Nearest-rank percentile of an already sorted list
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    rank = max(1, -(-len(values) * pct // 100))
+    return values[int(rank) - 1]
+
+
+def summarize(samples, wall_time, uploads, errors, sections, failed_sections, together, lambda_client, shared_db):
+    report = {
+        "uploads": uploads,
+        "completed": len(samples),
+        "errors": errors,
+        "wall_time_s": wall_time,
+        "throughput_per_s": len(samples) / wall_time if wall_time else 0.0,
+        "sections_read": sections,
+        "sections_failed": failed_sections,
+        "llm_requests": together.requests,
+        "llm_429s": together.throttled,
+        "formatter_handoffs": lambda_client.invocations,
+        "shared_db": shared_db,
+        "stages_ms": {},
+    }
+    for stage in STAGES:
+        values = sorted(sample[stage] * 1000 for sample in samples)
+        report["stages_ms"][stage] = {
+            "p50": percentile(values, 50),
+            "p95": percentile(values, 95),
+            "p99": percentile(values, 99),
+            "mean": sum(values) / len(values) if values else 0.0,
+        }
+    return report
+
+
+def print_report(report):
+    if not report["shared_db"]:
+        print("WARNING: each upload used its own database. In production the formatter re-formats every")
+        print("stored section on each run, so format latency and LLM requests below understate production load.")
+        print()
+    print(f"Uploads: {report['completed']}/{report['uploads']} completed, {report['errors']} failed")
+    print(f"Wall time: {report['wall_time_s']:.2f}s  Throughput: {report['throughput_per_s']:.2f} uploads/s")
+    print(f"Sections read: {report['sections_read']}  Sections with errors: {report['sections_failed']}")
+    print(f"LLM requests: {report['llm_requests']}  429 responses: {report['llm_429s']}")
+    print(f"Formatter follow-up invocations: {report['formatter_handoffs']}")
+    print()
+    print(f"{'stage':<10}{'p50 ms':>12}{'p95 ms':>12}{'p99 ms':>12}{'mean ms':>12}")
+    for stage, stats in report["stages_ms"].items():
+        print(f"{stage:<10}{stats['p50']:>12.1f}{stats['p95']:>12.1f}{stats['p99']:>12.1f}{stats['mean']:>12.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the resume-to-LinkedIn pipeline against local stand-ins.")
+    parser.add_argument("--uploads", type=int, default=20, help="number of simulated uploads")
+    parser.add_argument("--concurrency", type=int, default=5, help="uploads in flight at once")
+    parser.add_argument("--s3-latency", type=float, default=30, help="S3 call latency in ms")
+    parser.add_argument("--textract-latency", type=float, default=500, help="Textract call latency in ms")
+    parser.add_argument("--llm-latency", type=float, default=1000, help="Together call latency in ms")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="fraction of Together calls answered with 429")
+    parser.add_argument("--jitter", type=float, default=0.2, help="latency spread as a fraction of the mean")
+    parser.add_argument("--lambda-timeout", type=float, default=30000, help="formatter Lambda timeout in ms")
+    parser.add_argument("--deadline-margin", type=float, help="time the formatter keeps in reserve to hand off, in ms (default: the formatter's DEADLINE_MARGIN_MS)")
+    parser.add_argument("--per-upload-db", action="store_true", help="give each upload its own database (understates production load)")
+    parser.add_argument("--seed", type=int, help="random seed for latencies and 429s")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    db_dir = tempfile.mkdtemp(prefix="loadtest-db-")
+    database = LocalDatabase(db_dir, shared=not args.per_upload_db)
+    together = start_together_stub(args.llm_latency, args.jitter, args.rate_429)
+    s3 = StubS3(args.s3_latency, args.jitter)
+    textract = StubTextract(args.textract_latency, args.jitter)
+    lambda_client = StubLambda()
+    together_url = f"http://127.0.0.1:{together.server_port}/v1/chat/completions"
+    app, extractor, formatter = load_pipeline(
+        s3, textract, lambda_client, database, together_url, args.deadline_margin
+    )
+
+    run_id = int(time.time())
+    samples = []
+    errors = 0
+    sections = 0
+    failed_sections = 0
+    wall_time = 0.0
+
+    start = time.perf_counter()
+    try:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            futures = [
+                executor.submit(
+                    simulate_upload, app, extractor, formatter, lambda_client, database,
+                    args.lambda_timeout, run_id, i
+                )
+                for i in range(args.uploads)
+            ]
+            for future in concurrent.futures.as_completed(futures):
+                try:
+                    timings, read, failed = future.result()
+                    samples.append(timings)
+                    sections += read
+                    failed_sections += failed
+                except Exception as e:
+                    errors += 1
+                    print(f"Upload failed: {e}", file=sys.stderr)
+        wall_time = time.perf_counter() - start
+    finally:
+        together.shutdown()
+        shutil.rmtree(db_dir, ignore_errors=True)
+
+    report = summarize(
+        samples, wall_time, args.uploads, errors, sections, failed_sections, together, lambda_client,
+        not args.per_upload_db
+    )
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+    return report
+
+
+if __name__ == "__main__":
+    main()
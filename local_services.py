@@ -0,0 +1,143 @@
+import importlib.util
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+
+# Local stand-ins for Lambda and MySQL, shared by load_test.py and the tests.
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS resume_sections (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        section VARCHAR(255),
+        content TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS linkedin_profile_sections (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        section VARCHAR(100),
+        content TEXT,
+        run_id VARCHAR(64),
+        resume_section_id INTEGER,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+]
+
+
+def load_module(name, path):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+# Lambda stand-in: records asynchronous follow-up invocations so the caller can run them
+class StubLambda:
+    def __init__(self):
+        self.pending = threading.local()
+        self.lock = threading.Lock()
+        self.invocations = 0
+
+    def invoke(self, FunctionName, InvocationType, Payload):
+        with self.lock:
+            self.invocations += 1
+        if not hasattr(self.pending, "payloads"):
+            self.pending.payloads = []
+        self.pending.payloads.append(json.loads(Payload))
+        return {'StatusCode': 202}
+
+    # Return and clear the follow-up payloads queued by the current thread
+    def take(self):
+        payloads = getattr(self.pending, "payloads", [])
+        self.pending.payloads = []
+        return payloads
+
+
+# Stand-in for the Lambda context object, counting down from the function timeout
+class LambdaContext:
+    function_name = "formatter"
+    invoked_function_arn = "arn:aws:lambda:local:000000000000:function:formatter"
+
+    def __init__(self, timeout_ms):
+        self.aws_request_id = str(uuid.uuid4())
+        self.deadline = time.monotonic() + timeout_ms / 1000
+
+    def get_remaining_time_in_millis(self):
+        return max(0, int((self.deadline - time.monotonic()) * 1000))
+
+
+# Minimal pymysql-compatible wrappers around sqlite3
+class LocalCursor:
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cursor.close()
+
+    def execute(self, query, args=None):
+        # MySQL's `INT AUTO_INCREMENT PRIMARY KEY` is spelled `INTEGER PRIMARY KEY AUTOINCREMENT` in SQLite
+        query = re.sub(r"\bINT\s+AUTO_INCREMENT\s+PRIMARY\s+KEY\b", "INTEGER PRIMARY KEY AUTOINCREMENT", query)
+        # SQLite has no information_schema; list a table's columns with pragma_table_info instead
+        columns = re.search(r"FROM information_schema\.COLUMNS\b.*\bTABLE_NAME = '(\w+)'", query, re.S)
+        if columns:
+            return self.cursor.execute(f"SELECT name FROM pragma_table_info('{columns.group(1)}')")
+        query = query.replace("%s", "?")
+        return self.cursor.execute(query, args or ())
+
+    def fetchall(self):
+        return tuple(self.cursor.fetchall())
+
+
+class LocalConnection:
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+
+    def cursor(self):
+        return LocalCursor(self.conn.cursor())
+
+    def commit(self):
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+# Local MySQL stand-in. By default every upload reads and writes the same tables,
+# as in production, where the formatter re-formats every stored section on each run.
+# With `shared` off each simulated upload gets its own database file instead.
+class LocalDatabase:
+    def __init__(self, directory, shared=True):
+        self.directory = directory
+        self.shared = shared
+        self.current = threading.local()
+        self.lock = threading.Lock()
+        self.created = set()
+
+    def use(self, name):
+        self.current.name = "shared" if self.shared else name
+
+    def path(self):
+        name = getattr(self.current, "name", "shared")
+        path = os.path.join(self.directory, f"{name}.db")
+        with self.lock:
+            if path not in self.created:
+                conn = sqlite3.connect(path, timeout=30)
+                for statement in SCHEMA:
+                    conn.execute(statement)
+                conn.commit()
+                conn.close()
+                self.created.add(path)
+        return path
+
+    def connect(self, **kwargs):
+        return LocalConnection(self.path())
@@ -0,0 +1,218 @@
+import os
+import sqlite3
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+import boto3
+import pymysql
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from local_services import LambdaContext, LocalDatabase, StubLambda, load_module  # noqa: E402
+
+
+@pytest.fixture
+def pipeline(tmp_path, monkeypatch):
+    for name in ("DB_HOST", "DB_USER", "DB_PASSWORD", "DB_NAME", "TOGETHER_API_KEY"):
+        monkeypatch.setenv(name, "test")
+    database = LocalDatabase(str(tmp_path))
+    lambda_client = StubLambda()
+    monkeypatch.setattr(pymysql, "connect", database.connect)
+    monkeypatch.setattr(boto3, "client", lambda service, *args, **kwargs: lambda_client)
+
+    formatter = load_module("formatter", os.path.join(ROOT, "lambda", "formatter.py"))
+    formatter.DEADLINE_MARGIN_MS = 100
+    started = []
+    lock = threading.Lock()
+
+    # Stub LLM: each section sleeps for its configured latency (ms), 50 ms by default
+    def stub_llm(latencies):
+        def format_section(section, content):
+            with lock:
+                started.append(section)
+            time.sleep(latencies.get(section, 50) / 1000)
+            return f"- {content}"
+        formatter.format_section = format_section
+
+    def add_sections(rows):
+        conn = sqlite3.connect(database.path())
+        conn.executemany("INSERT INTO resume_sections (section, content) VALUES (?, ?)", rows)
+        conn.commit()
+        conn.close()
+
+    def replace_table(ddl):
+        conn = sqlite3.connect(database.path())
+        conn.execute("DROP TABLE linkedin_profile_sections")
+        conn.execute(ddl)
+        conn.commit()
+        conn.close()
+
+    def stored_sections():
+        conn = sqlite3.connect(database.path())
+        rows = conn.execute("SELECT section, content FROM linkedin_profile_sections").fetchall()
+        conn.close()
+        return dict(rows)
+
+    def stored_count():
+        conn = sqlite3.connect(database.path())
+        (count,) = conn.execute("SELECT COUNT(*) FROM linkedin_profile_sections").fetchone()
+        conn.close()
+        return count
+
+    return SimpleNamespace(
+        formatter=formatter,
+        lambda_client=lambda_client,
+        started=started,
+        stub_llm=stub_llm,
+        add_sections=add_sections,
+        replace_table=replace_table,
+        stored_sections=stored_sections,
+        stored_count=stored_count,
+    )
+
+
+def test_sections_start_longest_first(pipeline):
+    pipeline.formatter.MAX_WORKERS = 1
+    pipeline.stub_llm({})
+    pipeline.add_sections([("skills", "x" * 10), ("experience", "x" * 300), ("projects", "x" * 100)])
+
+    pipeline.formatter.lambda_handler({}, LambdaContext(10000))
+
+    assert pipeline.started == ["experience", "projects", "skills"]
+
+
+def test_unfinished_sections_are_handed_off_after_finished_ones_are_stored(pipeline):
+    pipeline.formatter.BASE_SECTION_MS = 100
+    pipeline.formatter.DEFAULT_MS_PER_CHAR = 0
+    pipeline.stub_llm({"experience": 2000})
+    pipeline.add_sections([("experience", "long"), ("skills", "python"), ("projects", "parser")])
+
+    pipeline.formatter.lambda_handler({}, LambdaContext(800))
+
+    assert pipeline.stored_sections() == {"skills": "- python", "projects": "- parser"}
+    payloads = pipeline.lambda_client.take()
+    assert len(payloads) == 1
+    assert payloads[0]["section_ids"] == [1]
+    assert payloads[0]["handoffs"] == 1
+
+
+def test_follow_up_gives_up_after_max_handoffs(pipeline):
+    pipeline.formatter.BASE_SECTION_MS = 100
+    pipeline.formatter.DEFAULT_MS_PER_CHAR = 0
+    pipeline.stub_llm({"experience": 2000})
+    pipeline.add_sections([("experience", "long"), ("skills", "python")])
+    event = {"section_ids": [1, 2], "run_id": "run-1", "handoffs": pipeline.formatter.MAX_HANDOFFS}
+
+    pipeline.formatter.lambda_handler(event, LambdaContext(800))
+
+    stored = pipeline.stored_sections()
+    assert stored["skills"] == "- python"
+    assert stored["experience"].startswith("Error: timed out")
+    assert pipeline.lambda_client.invocations == 0
+
+
+def test_zero_budget_invocation_does_not_hand_off(pipeline):
+    pipeline.stub_llm({})
+    pipeline.add_sections([("experience", "long"), ("skills", "python")])
+
+    with pytest.raises(RuntimeError):
+        pipeline.formatter.lambda_handler({}, LambdaContext(0))
+
+    assert pipeline.started == []
+    assert pipeline.lambda_client.invocations == 0
+    assert pipeline.stored_sections() == {}
+
+
+def test_follow_up_without_progress_stores_sections_as_errors(pipeline):
+    pipeline.stub_llm({})
+    pipeline.add_sections([("experience", "long"), ("skills", "python")])
+    event = {"section_ids": [1, 2], "run_id": "run-1", "handoffs": 1}
+
+    pipeline.formatter.lambda_handler(event, LambdaContext(0))
+
+    assert pipeline.started == []
+    assert pipeline.lambda_client.invocations == 0
+    stored = pipeline.stored_sections()
+    assert stored["experience"].startswith("Error: timed out")
+    assert stored["skills"].startswith("Error: timed out")
+
+
+def test_follow_up_only_formats_handed_off_sections(pipeline):
+    pipeline.stub_llm({})
+    pipeline.add_sections([("experience", "long"), ("skills", "python"), ("projects", "parser")])
+    event = {"section_ids": [2], "run_id": "run-1", "handoffs": 1}
+
+    pipeline.formatter.lambda_handler(event, LambdaContext(10000))
+
+    assert pipeline.started == ["skills"]
+    assert pipeline.stored_sections() == {"skills": "- python"}
+
+
+def test_existing_table_without_tracking_columns_is_migrated(pipeline):
+    pipeline.replace_table("""
+        CREATE TABLE linkedin_profile_sections (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            section VARCHAR(100),
+            content TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    pipeline.stub_llm({})
+    pipeline.add_sections([("experience", "long"), ("skills", "python")])
+
+    pipeline.formatter.lambda_handler({}, LambdaContext(10000))
+    pipeline.formatter.lambda_handler({}, LambdaContext(10000))
+
+    assert pipeline.stored_sections() == {"experience": "- long", "skills": "- python"}
+
+
+def test_margin_larger_than_timeout_still_formats_sections(pipeline):
+    pipeline.formatter.DEADLINE_MARGIN_MS = 10000
+    pipeline.stub_llm({})
+    pipeline.add_sections([("experience", "long"), ("skills", "python")])
+
+    pipeline.formatter.lambda_handler({}, LambdaContext(2000))
+
+    assert pipeline.stored_sections() == {"experience": "- long", "skills": "- python"}
+    assert pipeline.lambda_client.invocations == 0
+
+
+def test_retried_run_skips_sections_already_stored(pipeline):
+    pipeline.stub_llm({})
+    pipeline.add_sections([("experience", "long"), ("skills", "python")])
+    context = LambdaContext(10000)
+
+    pipeline.formatter.lambda_handler({}, context)
+    pipeline.started.clear()
+    pipeline.formatter.lambda_handler({}, context)
+
+    assert pipeline.started == []
+    assert pipeline.stored_count() == 2
+
+
+def test_failed_hand_off_stores_leftover_sections_as_errors(pipeline, monkeypatch):
+    pipeline.formatter.BASE_SECTION_MS = 100
+    pipeline.formatter.DEFAULT_MS_PER_CHAR = 0
+    pipeline.stub_llm({"experience": 2000})
+    pipeline.add_sections([("experience", "long"), ("skills", "python")])
+
+    def invoke(**kwargs):
+        raise RuntimeError("AccessDenied")
+    monkeypatch.setattr(pipeline.lambda_client, "invoke", invoke)
+
+    pipeline.formatter.lambda_handler({}, LambdaContext(800))
+
+    stored = pipeline.stored_sections()
+    assert stored["skills"] == "- python"
+    assert stored["experience"].startswith("Error: could not hand off")
+
+
+def test_short_inputs_do_not_inflate_estimates(pipeline):
+    formatter = pipeline.formatter
+    formatter.record_section_latency("projects", "N/A", 1500)
+
+    assert formatter.estimate_section_ms("projects", "x" * 400) == formatter.BASE_SECTION_MS + formatter.DEFAULT_MS_PER_CHAR * 400